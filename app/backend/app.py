@@ -1,18 +1,39 @@
+import asyncio
+import contextlib
+import hashlib
 import logging
 import os
+from collections.abc import AsyncIterator
 from pathlib import Path
+from typing import Final, Optional
 
 from aiohttp import web
 from azure.core.credentials import AzureKeyCredential
-from azure.identity import AzureDeveloperCliCredential, DefaultAzureCredential
+from azure.identity import (
+    AzureDeveloperCliCredential,
+    DefaultAzureCredential,
+    get_bearer_token_provider,
+)
 from dotenv import load_dotenv
+from openai import AsyncAzureOpenAI
 
-from ragtools import attach_rag_tools
+from ragtools import attach_rag_tools, form_writer, seed_semantic_cache, supabase
 from rtmt import RTMiddleTier
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("voicerag")
 
+_SYSTEM_MESSAGE: Final[str] = """You are a helpful AI assistant for the Raleigh Water Department hotline, designed to provide residents with fast, accurate answers to FAQs about water services. When a new call begins, always start by briefly introducing yourself and explaining your role.
+Your responses must be clear, concise, and ideally a single short sentence suitable for audio delivery. Always follow these steps:
+1. Introduce Yourself: If this is the start of a call, begin with a brief greeting such as "Hello, I'm the Raleigh Water hotline assistant, here to help with your water service questions."
+2. If you detect another language spoken besides English, ask the user if they would like to switch to that language.
+3. Use the RAG Tools: Use the 'search' tool to consult the knowledge base for the most current and relevant information, and use the 'report_grounding' tool to document your source (do not read this aloud).
+4. Keep it Concise: Provide an answer in as short a sentence as possible. If the answer isn't in the knowledge base, say "I'm sorry, I don't have that information."
+5. Maintain Confidentiality: Do not mention file names, source names, or keys in your audible responses.
+6. Offer Further Assistance: If more details are needed or the question cannot be fully answered, offer to collect a callback number or connect the caller with a human operator.
+7. Utility Assistance: If a resident mentions difficulty paying their water bill or asks about financial help, use the 'fill_out_utility_form' tool to help them complete an application for utility assistance. Once the form is filled out, use the 'save_utility_form' tool to save the information.
+8. Prioritize Accuracy: Ensure your responses are accurate, relevant, and up-to-date."""
+
 async def create_app():
     if not os.environ.get("RUNNING_IN_PRODUCTION"):
         logger.info("Running in development mode, loading from .env file")
@@ -33,6 +54,7 @@ async def create_app():
     search_credential = AzureKeyCredential(search_key) if search_key else credential
     
     app = web.Application()
+    current_directory = Path(__file__).parent
 
     rtmt = RTMiddleTier(
         credentials=llm_credential,
@@ -40,20 +62,22 @@ async def create_app():
         deployment=os.environ["AZURE_OPENAI_REALTIME_DEPLOYMENT"],
         voice_choice=os.environ.get("AZURE_OPENAI_REALTIME_VOICE_CHOICE") or "alloy"
     )
-    rtmt.system_message = """
-You are a helpful AI assistant for the Raleigh Water Department hotline, designed to provide residents with fast, accurate answers to FAQs about water services. When a new call begins, always start by briefly introducing yourself and explaining your role.
-Your responses must be clear, concise, and ideally a single short sentence suitable for audio delivery. Always follow these steps:
-1. Introduce Yourself: If this is the start of a call, begin with a brief greeting such as "Hello, I'm the Raleigh Water hotline assistant, here to help with your water service questions."
-2. If you detect another language spoken besides English, ask the user if they would like to switch to that language.
-3. Use the RAG Tools: Use the 'search' tool to consult the knowledge base for the most current and relevant information, and use the 'report_grounding' tool to document your source (do not read this aloud).
-4. Keep it Concise: Provide an answer in as short a sentence as possible. If the answer isn't in the knowledge base, say "I'm sorry, I don't have that information."
-5. Maintain Confidentiality: Do not mention file names, source names, or keys in your audible responses.
-6. Offer Further Assistance: If more details are needed or the question cannot be fully answered, offer to collect a callback number or connect the caller with a human operator.
-7. Utility Assistance: If a resident mentions difficulty paying their water bill or asks about financial help, use the 'fill_out_utility_form' tool to help them complete an application for utility assistance. Once the form is filled out, use the 'save_utility_form' tool to save the information.
-8. Prioritize Accuracy: Ensure your responses are accurate, relevant, and up-to-date.
-""".strip()
 
-    attach_rag_tools(rtmt,
+    embedding_client = None
+    if embedding_deployment := os.environ.get("AZURE_OPENAI_EMBEDDING_DEPLOYMENT"):
+        # The realtime endpoint may be configured as wss://, the embeddings API is plain https
+        openai_endpoint = os.environ["AZURE_OPENAI_ENDPOINT"].replace("wss://", "https://", 1)
+        if llm_key:
+            embedding_client = AsyncAzureOpenAI(azure_endpoint=openai_endpoint, api_key=llm_key, api_version="2024-06-01")
+        else:
+            token_provider = get_bearer_token_provider(credential, "https://cognitiveservices.azure.com/.default")
+            token_provider() # Warm up during startup so we have a token cached when the first request arrives
+            embedding_client = AsyncAzureOpenAI(azure_endpoint=openai_endpoint, azure_ad_token_provider=token_provider, api_version="2024-06-01")
+        app.on_cleanup.append(lambda _: embedding_client.close())
+
+    rtmt.system_message = _SYSTEM_MESSAGE
+
+    search_client = attach_rag_tools(rtmt,
         credentials=search_credential,
         search_endpoint=os.environ.get("AZURE_SEARCH_ENDPOINT"),
         search_index=os.environ.get("AZURE_SEARCH_INDEX"),
@@ -63,15 +87,73 @@ Your responses must be clear, concise, and ideally a single short sentence suita
         embedding_field=os.environ.get("AZURE_SEARCH_EMBEDDING_FIELD") or "text_vector",
         title_field=os.environ.get("AZURE_SEARCH_TITLE_FIELD") or "title",
         use_vector_query=(os.environ.get("AZURE_SEARCH_USE_VECTOR_QUERY") == "true") or True,
+        embedding_client=embedding_client,
+        embedding_deployment=embedding_deployment,
+        semantic_cache_threshold=float(os.environ.get("SEMANTIC_CACHE_THRESHOLD") or 0.92),
+        semantic_cache_ttl=float(os.environ.get("SEMANTIC_CACHE_TTL") or 300),
     )
+    # The search client owns the pooled aiohttp session, keep it open for the app's lifetime
+    app.on_cleanup.append(lambda _: search_client.close())
+    app.cleanup_ctx.append(form_writer)
+
+    async def warmup() -> None:
+        # Open connections to the backing services at startup, so the first caller doesn't pay
+        # for DNS, TLS and token acquisition. Failures are logged and left to the first real call.
+        warmups = {"Azure AI Search": search_client.get_document_count()}
+        if embedding_client:
+            # Seeding embeds the common questions in one batch, which also warms up the embeddings client
+            warmups["search cache seed"] = seed_semantic_cache(
+                rtmt.tools["search"],
+                embedding_client,
+                embedding_deployment,
+                current_directory / "data/faq_seed.jsonl",
+                ttl=float(os.environ.get("SEMANTIC_CACHE_SEED_TTL") or 3600)
+            )
+        if supabase:
+            warmups["Supabase"] = asyncio.to_thread(
+                lambda: supabase.table("raleigh_utility_forms").select("id", count="exact").limit(0).execute()
+            )
+        results = await asyncio.gather(*warmups.values(), return_exceptions=True)
+        for name, result in zip(warmups, results):
+            if isinstance(result, Exception):
+                logger.warning("Warm-up of %s failed: %s", name, result)
+
+    async def background_warmup(app: web.Application) -> AsyncIterator[None]:
+        # Run the warm-up alongside serving rather than in startup, a slow or unreachable
+        # service would otherwise hold the worker past gunicorn's boot timeout
+        task = asyncio.create_task(warmup())
+        yield
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+
+    app.cleanup_ctx.append(background_warmup)
 
     # Verify that all tools are attached
     logger.info("Attached tools: %s", ", ".join(rtmt.tools.keys()))
 
     rtmt.attach_to_app(app, "/realtime")
 
-    current_directory = Path(__file__).parent
-    app.add_routes([web.get('/', lambda _: web.FileResponse(current_directory / 'static/index.html'))])
+    # The index shell is tiny and loaded on every call start, serve it from memory and let
+    # browsers revalidate with the ETag rather than re-reading the file per request. It's
+    # read on first request so the backend still starts without a frontend build.
+    index_html: Optional[bytes] = None
+    index_headers: dict[str, str] = {}
+
+    async def index(request: web.Request) -> web.Response:
+        nonlocal index_html, index_headers
+        if index_html is None:
+            try:
+                index_html = (current_directory / 'static/index.html').read_bytes()
+            except FileNotFoundError:
+                raise web.HTTPNotFound()
+            index_etag = f'"{hashlib.md5(index_html, usedforsecurity=False).hexdigest()}"'
+            index_headers = {'ETag': index_etag, 'Cache-Control': 'no-cache'}
+        if request.headers.get('If-None-Match') == index_headers['ETag']:
+            return web.Response(status=304, headers=index_headers)
+        return web.Response(body=index_html, content_type='text/html', headers=index_headers)
+
+    app.add_routes([web.get('/', index)])
     app.router.add_static('/', path=current_directory / 'static', name='static')
     
     return app
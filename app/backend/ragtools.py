@@ -1,17 +1,43 @@
+import asyncio
 import json
+import logging
 import os
-import re
+import string
+from collections import OrderedDict
+from collections.abc import AsyncIterator
 from typing import Any, Optional
 from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+from types import MappingProxyType
 
+import aiohttp
+from aiohttp import web
 from azure.core.credentials import AzureKeyCredential
+from azure.core.pipeline.transport import AioHttpTransport
 from azure.identity import DefaultAzureCredential
 from azure.search.documents.aio import SearchClient
-from azure.search.documents.models import VectorizableTextQuery
+from azure.search.documents.models import VectorizableTextQuery, VectorizedQuery
+from openai import AsyncAzureOpenAI
+from postgrest.exceptions import APIError
 
 from rtmt import RTMiddleTier, Tool, ToolResult, ToolResultDirection
+from semcache import SemanticCache
 from supabase import create_client, Client
 
+logger = logging.getLogger("voicerag.ragtools")
+
+try:
+    import orjson
+
+    def _json_dumps(obj: Any) -> str:
+        return orjson.dumps(obj).decode()
+
+    _json_loads = orjson.loads
+except ImportError:
+    _json_dumps = json.dumps
+    _json_loads = json.loads
+
 # --------------------------------------------------------------------------------
 # JSON Schemas
 # --------------------------------------------------------------------------------
@@ -192,10 +218,12 @@ _save_utility_form_schema = {
 # Utility Parsers
 # --------------------------------------------------------------------------------
 
+@lru_cache(maxsize=1024)
 def try_parse_date(date_str: Optional[str]) -> Optional[str]:
     """
     Attempt to parse a date in 'YYYY-MM-DD' format. Returns an ISO 8601 string 
     (YYYY-MM-DD) if successful, or None if missing or invalid.
+    Results are cached, the same dates (birthdates, empty defaults) recur across forms.
     """
     if not date_str:
         return None
@@ -209,33 +237,37 @@ def try_parse_date(date_str: Optional[str]) -> Optional[str]:
 # Helper Functions (Tool Implementations)
 # --------------------------------------------------------------------------------
 
+# Defaults for every field of the form, shared across calls. Callers must not mutate the
+# nested lists/dicts of a merged form, they are the template's own objects.
+_DEFAULT_FORM_TEMPLATE = MappingProxyType({
+    "county_case_number": "", "social_security_number": "", "date_of_birth": "",
+    "first_name": "", "middle_initial": "", "last_name": "", "suffix": "",
+    "residence_address_street": "", "residence_address_city": "", "residence_address_zip": "",
+    "mailing_address_street": "", "mailing_address_city": "", "mailing_address_zip": "",
+    "phone_number": "", "email_address": "",
+    "household_members": [], "additional_income_sources": [], "additional_family_members": [],
+    "are_you_currently_receiving": {
+        "energy_assistance_cip_lieap": False, "food_and_nutrition_fns_snap": False,
+        "medicaid": False, "work_first": False
+    },
+    "have_you_received_raleigh_water_assistance": False,
+    "most_recent_raleigh_water_assistance_date": "",
+    "are_you_renting_your_home_apartment": "",
+    "amount_due": "", "service_current_on": False,
+    "city_of_raleigh_utility_account_number": "", "name_on_account": "",
+    "would_you_like_to_register_to_vote": False,
+    "signature_applicant": "", "signature_date": ""
+})
+
+_FORM_DATE_COLUMNS = ("date_of_birth", "most_recent_raleigh_water_assistance_date", "signature_date")
+
 async def _fill_out_utility_form(args: Any) -> ToolResult:
     """
     Merges the user-provided arguments into a structured representation
     of the Utility Assistance Application form, ensuring all fields are filled.
     """
-    default_form = {
-        "county_case_number": "", "social_security_number": "", "date_of_birth": "",
-        "first_name": "", "middle_initial": "", "last_name": "", "suffix": "",
-        "residence_address_street": "", "residence_address_city": "", "residence_address_zip": "",
-        "mailing_address_street": "", "mailing_address_city": "", "mailing_address_zip": "",
-        "phone_number": "", "email_address": "",
-        "household_members": [], "additional_income_sources": [], "additional_family_members": [],
-        "are_you_currently_receiving": {
-            "energy_assistance_cip_lieap": False, "food_and_nutrition_fns_snap": False,
-            "medicaid": False, "work_first": False
-        },
-        "have_you_received_raleigh_water_assistance": False,
-        "most_recent_raleigh_water_assistance_date": "",
-        "are_you_renting_your_home_apartment": "",
-        "amount_due": "", "service_current_on": False,
-        "city_of_raleigh_utility_account_number": "", "name_on_account": "",
-        "would_you_like_to_register_to_vote": False,
-        "signature_applicant": "", "signature_date": ""
-    }
-    
-    filled_form = {**default_form, **dict(args)}
-    return ToolResult(json.dumps(filled_form), destination=ToolResultDirection.TO_SERVER)
+    filled_form = _DEFAULT_FORM_TEMPLATE | dict(args)
+    return ToolResult(_json_dumps(filled_form), destination=ToolResultDirection.TO_SERVER)
 
 # Create a single Supabase client at module level
 SUPABASE_URL = os.environ.get("NEXT_PUBLIC_SUPABASE_URL")
@@ -244,142 +276,368 @@ supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY) if (SUPABASE_URL an
 
 async def _save_utility_form(args: Any) -> ToolResult:
     """
-    Insert the 'form_data' into our 'raleigh_utility_forms' table, mapping 
+    Queue the 'form_data' for insertion into our 'raleigh_utility_forms' table, mapping 
     each field to a corresponding column, including parsing of date strings.
+    Rows are written in batches by the form_writer background task.
 
     For arrays/objects (like household_members), we store them directly as JSONB.
     """
     if not supabase:
         return ToolResult(
-            json.dumps({
+            _json_dumps({
                 "status": "error",
                 "message": "Supabase client is not configured. Check your SUPABASE_URL/KEY environment."
             }),
             destination=ToolResultDirection.TO_SERVER
         )
 
-    try:
-        form_data = json.loads(args.get("form_data", "{}"))
-    except json.JSONDecodeError:
+    # The schema declares form_data as an object, but accept it JSON-encoded as well
+    form_data = args.get("form_data") or {}
+    if isinstance(form_data, str):
+        try:
+            form_data = _json_loads(form_data)
+        except json.JSONDecodeError:
+            form_data = None
+    if not isinstance(form_data, dict):
         return ToolResult(
-            json.dumps({
+            _json_dumps({
                 "status": "error",
                 "message": "Invalid JSON in form_data"
             }),
             destination=ToolResultDirection.TO_SERVER
         )
 
-    # Map raw strings + booleans + arrays to columns in the table
-    mapped_data = {
-        "county_case_number": form_data.get("county_case_number"),
-        "social_security_number": form_data.get("social_security_number"),
-        "date_of_birth": try_parse_date(form_data.get("date_of_birth")),
-        "first_name": form_data.get("first_name"),
-        "middle_initial": form_data.get("middle_initial"),
-        "last_name": form_data.get("last_name"),
-        "suffix": form_data.get("suffix"),
-        "residence_address_street": form_data.get("residence_address_street"),
-        "residence_address_city": form_data.get("residence_address_city"),
-        "residence_address_zip": form_data.get("residence_address_zip"),
-        "mailing_address_street": form_data.get("mailing_address_street"),
-        "mailing_address_city": form_data.get("mailing_address_city"),
-        "mailing_address_zip": form_data.get("mailing_address_zip"),
-        "phone_number": form_data.get("phone_number"),
-        "email_address": form_data.get("email_address"),
-        "household_members": form_data.get("household_members"),
-        "additional_income_sources": form_data.get("additional_income_sources"),
-        "additional_family_members": form_data.get("additional_family_members"),
-        "are_you_currently_receiving": form_data.get("are_you_currently_receiving"),
-        "have_you_received_raleigh_water_assistance": form_data.get("have_you_received_raleigh_water_assistance"),
-        "most_recent_raleigh_water_assistance_date": try_parse_date(form_data.get("most_recent_raleigh_water_assistance_date")),
-        "are_you_renting_your_home_apartment": form_data.get("are_you_renting_your_home_apartment"),
-        "amount_due": form_data.get("amount_due"),
-        "service_current_on": form_data.get("service_current_on"),
-        "city_of_raleigh_utility_account_number": form_data.get("city_of_raleigh_utility_account_number"),
-        "name_on_account": form_data.get("name_on_account"),
-        "would_you_like_to_register_to_vote": form_data.get("would_you_like_to_register_to_vote"),
-        "signature_applicant": form_data.get("signature_applicant"),
-        "signature_date": try_parse_date(form_data.get("signature_date"))
-    }
+    # Form fields map 1:1 to columns in the table, unknown keys are dropped and only
+    # the dates need normalizing
+    mapped_data = {k: form_data.get(k, default) for k, default in _DEFAULT_FORM_TEMPLATE.items()}
+    for k in _FORM_DATE_COLUMNS:
+        mapped_data[k] = try_parse_date(mapped_data[k])
 
     try:
-        response = supabase.table("raleigh_utility_forms").insert(mapped_data).execute()
+        _form_queue.put_nowait(mapped_data)
+    except asyncio.QueueFull:
         return ToolResult(
-            json.dumps({
-                "status": "success",
-                "message": "Utility form data inserted successfully.",
-                "inserted_rows": response.data
-            }),
-            destination=ToolResultDirection.TO_SERVER
-        )
-    except Exception as e:
-        return ToolResult(
-            json.dumps({
+            _json_dumps({
                 "status": "error",
-                "message": f"Error inserting data: {str(e)}",
+                "message": "Too many forms are waiting to be saved, please try again shortly."
             }),
             destination=ToolResultDirection.TO_SERVER
         )
+    return ToolResult(
+        _json_dumps({
+            "status": "queued",
+            "message": "Utility form data queued for saving."
+        }),
+        destination=ToolResultDirection.TO_SERVER
+    )
+
+# Forms are buffered and written in batches by a background task, so a surge of
+# submissions costs one Supabase round trip per batch rather than per form. While
+# Supabase is down the writer holds its batch and the queue bound pushes back on callers.
+_FORM_BATCH_SIZE = 100
+_FORM_FLUSH_INTERVAL = 0.5  # seconds
+_FORM_QUEUE_SIZE = 1000
+_FORM_RETRY_DELAY = 5  # seconds
+_FORM_MAX_RETRY_DELAY = 60  # seconds
+_form_queue: asyncio.Queue[Optional[dict]] = asyncio.Queue(maxsize=_FORM_QUEUE_SIZE)
+
+def _insert_rows(rows: list[dict]) -> None:
+    supabase.table("raleigh_utility_forms").insert(rows).execute()
+
+def _describe_error(error: Exception) -> str:
+    # Supabase error details can echo column values, log only the error code or type
+    # since rows hold personal data
+    return f"{type(error).__name__} {getattr(error, 'code', None) or ''}".strip()
+
+def _is_rejected(error: Exception) -> bool:
+    """
+    Whether Supabase answered and rejected the rows themselves (a 4xx), as opposed to
+    being unreachable, timing out or failing on its side, where retrying later may work.
+    """
+    if not isinstance(error, APIError):
+        return False
+    # Non-JSON error responses carry the HTTP status as the code, PostgREST's PGRST00x
+    # codes mean it couldn't reach the database
+    if isinstance(error.code, int):
+        return 400 <= error.code < 500
+    return not (error.code or "").startswith("PGRST00")
+
+async def _insert_forms(rows: list[dict]) -> list[dict]:
+    """
+    Inserts rows in one request and returns the ones left to retry because Supabase
+    couldn't be reached. If Supabase rejects the batch, rows are inserted one at a time
+    so a single bad row doesn't take the rest down with it; rejected rows are dropped.
+    """
+    # supabase-py is synchronous, run the inserts on a worker thread so they don't stall the event loop
+    try:
+        await asyncio.to_thread(_insert_rows, rows)
+        return []
+    except Exception as e:
+        if not _is_rejected(e):
+            logger.error("Error inserting %d utility forms, will retry: %s", len(rows), _describe_error(e))
+            return rows
+        logger.error("Error inserting %d utility forms, retrying them one at a time: %s", len(rows), _describe_error(e))
+
+    for i, row in enumerate(rows):
+        try:
+            await asyncio.to_thread(_insert_rows, [row])
+        except Exception as e:
+            if not _is_rejected(e):
+                logger.error("Error inserting utility form, will retry %d forms: %s", len(rows) - i, _describe_error(e))
+                return rows[i:]
+            logger.error("Dropped a utility form Supabase rejected: %s", _describe_error(e))
+    return []
+
+async def _flush_forms(stopping: asyncio.Event) -> None:
+    """
+    Collects up to _FORM_BATCH_SIZE queued forms, or whatever arrived within
+    _FORM_FLUSH_INTERVAL of the first one, and inserts them in one request. If Supabase
+    can't be reached the batch is retried with exponential backoff. Returns once
+    `stopping` is set, after one last attempt at the pending batch.
+    """
+    loop = asyncio.get_running_loop()
+    while not stopping.is_set():
+        form = await _form_queue.get()
+        if form is None:
+            return
+        batch = [form]
+        deadline = loop.time() + _FORM_FLUSH_INTERVAL
+        while len(batch) < _FORM_BATCH_SIZE and (timeout := deadline - loop.time()) > 0:
+            try:
+                form = await asyncio.wait_for(_form_queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            if form is None:
+                break
+            batch.append(form)
+
+        delay = _FORM_RETRY_DELAY
+        while (batch := await _insert_forms(batch)) and not stopping.is_set():
+            try:
+                await asyncio.wait_for(stopping.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+            delay = min(delay * 2, _FORM_MAX_RETRY_DELAY)
+        if batch:
+            logger.error("Shutting down with Supabase unreachable, %d utility forms were not saved", len(batch))
+
+async def form_writer(app: web.Application) -> AsyncIterator[None]:
+    """
+    aiohttp cleanup context running the batch writer for the app's lifetime. On
+    shutdown the queue is drained so in-flight forms aren't lost.
+    """
+    if not supabase:
+        yield
+        return
+    stopping = asyncio.Event()
+    writer = asyncio.create_task(_flush_forms(stopping))
+    yield
+    stopping.set()
+    try:
+        # Wakes the writer if it's waiting for forms; a full queue means it isn't
+        _form_queue.put_nowait(None)
+    except asyncio.QueueFull:
+        pass
+    await writer
+    remaining = []
+    while not _form_queue.empty():
+        if (form := _form_queue.get_nowait()) is not None:
+            remaining.append(form)
+    if remaining and (unsaved := await _insert_forms(remaining)):
+        logger.error("Shutting down with Supabase unreachable, %d utility forms were not saved", len(unsaved))
+
+# Source keys may only contain [a-zA-Z0-9_=-]. Deleting the allowed characters with
+# str.translate leaves an empty string for valid keys, without going through the regex engine.
+_KEY_CHARS_TABLE = str.maketrans("", "", string.ascii_letters + string.digits + "_=-")
+
+def _is_valid_key(key: str) -> bool:
+    return bool(key) and not key.translate(_KEY_CHARS_TABLE)
+
+# Search hits are remembered by source id so grounding can usually skip a second search
+_SOURCE_CACHE_SIZE = 1024
+
+def _cache_source(source_cache: OrderedDict[str, dict], doc: dict) -> None:
+    source_cache[doc["chunk_id"]] = doc
+    source_cache.move_to_end(doc["chunk_id"])
+    if len(source_cache) > _SOURCE_CACHE_SIZE:
+        source_cache.popitem(last=False)
+
+# Query embeddings are computed client-side and cached, so repeated queries skip the
+# embedding call and Azure Search doesn't have to vectorize the query itself
+_EMBEDDING_CACHE_SIZE = 2048
+_embedding_cache: OrderedDict[str, list[float]] = OrderedDict()
+
+def _normalize_query(text: str) -> str:
+    """Lowercases, collapses whitespace and drops trailing punctuation, so trivially different
+    phrasings of the same question share cache entries."""
+    return " ".join(text.lower().split()).rstrip("?.!")
+
+def _cache_embedding(text: str, embedding: list[float]) -> None:
+    key = _normalize_query(text)
+    _embedding_cache[key] = embedding
+    _embedding_cache.move_to_end(key)
+    if len(_embedding_cache) > _EMBEDDING_CACHE_SIZE:
+        _embedding_cache.popitem(last=False)
 
-KEY_PATTERN = re.compile(r'^[a-zA-Z0-9_=\-]+$')
+async def _cached_embed(embedding_client: AsyncAzureOpenAI, embedding_deployment: str, text: str) -> list[float]:
+    key = _normalize_query(text)
+    if (embedding := _embedding_cache.get(key)) is not None:
+        _embedding_cache.move_to_end(key)
+        return embedding
+    response = await embedding_client.embeddings.create(model=embedding_deployment, input=text)
+    embedding = response.data[0].embedding
+    _cache_embedding(text, embedding)
+    return embedding
+
+# Seed searches run a few at a time so lower search tiers don't throttle the warm-up
+_SEED_CONCURRENCY = 4
+
+async def seed_semantic_cache(
+    search_tool: Tool,
+    embedding_client: AsyncAzureOpenAI,
+    embedding_deployment: str,
+    seed_path: Path,
+    ttl: float = 3600
+) -> None:
+    """
+    Pre-populates the search cache with common questions, one per line of `seed_path` as
+    {"q": "..."}, so the first callers after a cold start don't all miss. The questions are
+    embedded in a single batched request, then searched through the search tool, which
+    finds their embeddings cached and stores the results for `ttl` seconds.
+    """
+    with open(seed_path, encoding="utf-8") as f:
+        queries = [_json_loads(line)["q"] for line in f if line.strip()]
+    if not queries:
+        return
+    response = await embedding_client.embeddings.create(model=embedding_deployment, input=queries)
+    for query, item in zip(queries, response.data):
+        _cache_embedding(query, item.embedding)
+    semaphore = asyncio.Semaphore(_SEED_CONCURRENCY)
+
+    async def seed(query: str) -> None:
+        async with semaphore:
+            await search_tool.target({"query": query}, ttl=ttl)
+
+    await asyncio.gather(*(seed(q) for q in queries))
+    logger.info("Seeded search cache with %d queries", len(queries))
+
+async def _search_documents(search_client: SearchClient, **kwargs: Any) -> list[dict]:
+    search_results = await search_client.search(**kwargs)
+    return [r async for r in search_results]
 
 async def _search_tool(
     search_client: SearchClient,
+    semantic_cache: SemanticCache | None,
+    embedding_client: AsyncAzureOpenAI | None,
+    embedding_deployment: str | None,
+    source_cache: OrderedDict[str, dict],
     semantic_configuration: str | None,
     identifier_field: str,
+    title_field: str,
     content_field: str,
     embedding_field: str,
     use_vector_query: bool,
-    args: Any
+    select_fields: list[str],
+    args: Any,
+    ttl: float | None = None
 ) -> ToolResult:
-    print(f"Searching for '{args['query']}' in the knowledge base.")
+    logger.debug("Searching for '%s' in the knowledge base.", args['query'])
+    query_key = _normalize_query(args['query'])
+    query_embedding = None
+    if embedding_client is not None:
+        # Callers ask a small set of recurring questions, serve repeats and paraphrases of
+        # earlier queries from the cache instead of going back to Azure Search
+        if (cached := semantic_cache.lookup_exact(query_key)) is not None:
+            return ToolResult(cached, destination=ToolResultDirection.TO_SERVER)
+        query_embedding = await _cached_embed(embedding_client, embedding_deployment, args['query'])
+        if (cached := await semantic_cache.lookup(query_embedding)) is not None:
+            cached_result, expires_at = cached
+            semantic_cache.add_exact(query_key, cached_result, expires_at=expires_at)
+            return ToolResult(cached_result, destination=ToolResultDirection.TO_SERVER)
+    # The search only goes out once the cache has missed, as a single hybrid query: starting
+    # it speculatively alongside the embedding would cost a search request on every cache
+    # hit, and splitting it into text and vector legs would double requests per miss and
+    # keep vector-only hits away from the semantic ranker
     vector_queries = []
     if use_vector_query:
-        vector_queries.append(VectorizableTextQuery(
-            text=args['query'], 
-            k_nearest_neighbors=50, 
-            fields=embedding_field
-        ))
-    search_results = await search_client.search(
+        if query_embedding is not None:
+            vector_queries.append(VectorizedQuery(
+                vector=query_embedding,
+                k_nearest_neighbors=50,
+                fields=embedding_field
+            ))
+        else:
+            vector_queries.append(VectorizableTextQuery(
+                text=args['query'], 
+                k_nearest_neighbors=50, 
+                fields=embedding_field
+            ))
+    docs = await _search_documents(
+        search_client,
         search_text=args["query"], 
         query_type="semantic" if semantic_configuration else "simple",
         semantic_configuration_name=semantic_configuration,
         top=5,
         vector_queries=vector_queries,
-        select=", ".join([identifier_field, content_field])
+        select=select_fields
     )
-    result = ""
-    async for r in search_results:
-        result += f"[{r[identifier_field]}]: {r[content_field]}\n-----\n"
+
+    parts: list[str] = []
+    for r in docs:
+        parts.append(f"[{r[identifier_field]}]: {r[content_field]}\n-----\n")
+        _cache_source(source_cache, {
+            "chunk_id": r[identifier_field],
+            "title": r[title_field],
+            "chunk": r[content_field]
+        })
+    result = "".join(parts)
+    # Don't cache empty results, the index may still be filling (e.g. the indexer running
+    # right after deployment) and a miss shouldn't stick for the whole TTL
+    if query_embedding is not None and result:
+        await semantic_cache.add(query_embedding, result, ttl=ttl)
+        semantic_cache.add_exact(query_key, result, ttl=ttl)
     return ToolResult(result, destination=ToolResultDirection.TO_SERVER)
 
+# The model controls the sources list, bound it so a runaway citation list can't turn
+# into an unbounded OR query, and split lookups into small parallel queries
+_MAX_GROUNDING_SOURCES = 20
+_GROUNDING_BATCH_SIZE = 10
+
 async def _report_grounding_tool(
     search_client: SearchClient,
+    source_cache: OrderedDict[str, dict],
     identifier_field: str,
     title_field: str,
     content_field: str,
+    select_fields: list[str],
     args: Any
 ) -> ToolResult:
-    sources = [s for s in args["sources"] if KEY_PATTERN.match(s)]
-    list_of_sources = " OR ".join(sources)
-    print(f"Grounding source: {list_of_sources}")
-
-    search_results = await search_client.search(
-        search_text=list_of_sources,
-        search_fields=[identifier_field],
-        select=[identifier_field, title_field, content_field],
-        top=len(sources),
-        query_type="full"
-    )
-    
-    docs = []
-    async for r in search_results:
-        docs.append({
+    sources = list(dict.fromkeys(s for s in args["sources"] if _is_valid_key(s)))[:_MAX_GROUNDING_SOURCES]
+    logger.debug("Grounding sources: %s", sources)
+
+    # Sources normally come from the preceding search call, only look up the ones we haven't seen
+    missing = [s for s in sources if s not in source_cache]
+    batches = [missing[i:i + _GROUNDING_BATCH_SIZE] for i in range(0, len(missing), _GROUNDING_BATCH_SIZE)]
+    results = await asyncio.gather(*(
+        _search_documents(
+            search_client,
+            search_text=" OR ".join(batch),
+            search_fields=[identifier_field],
+            select=select_fields,
+            top=len(batch),
+            query_type="full"
+        )
+        for batch in batches
+    ))
+    for r in (r for batch_results in results for r in batch_results):
+        _cache_source(source_cache, {
             "chunk_id": r[identifier_field],
             "title": r[title_field],
             "chunk": r[content_field]
         })
-    return ToolResult(json.dumps({"sources": docs}), destination=ToolResultDirection.TO_CLIENT)
+
+    docs = [source_cache[s] for s in sources if s in source_cache]
+    return ToolResult(_json_dumps({"sources": docs}), destination=ToolResultDirection.TO_CLIENT)
 
 # --------------------------------------------------------------------------------
 # attach_rag_tools
@@ -394,33 +652,66 @@ def attach_rag_tools(
     content_field: str,
     embedding_field: str,
     title_field: str,
-    use_vector_query: bool
-) -> None:
+    use_vector_query: bool,
+    embedding_client: AsyncAzureOpenAI | None = None,
+    embedding_deployment: str | None = None,
+    semantic_cache_threshold: float = 0.92,
+    semantic_cache_ttl: float = 300
+) -> SearchClient:
     """
     Attaches all standard RAG tools plus our new form-filling and supabase-saving tools.
+    Search results are cached by query similarity when an embedding client is provided.
+    Returns the search client so the caller can close its connection pool on shutdown.
     """
     if not isinstance(credentials, AzureKeyCredential):
         credentials.get_token("https://search.azure.com/.default")  # warm up token
 
-    # Create the Azure Search client
+    # Create the Azure Search client on a long-lived connection pool, every turn does a
+    # search + grounding pair and keepalives expiring between calls means new TLS handshakes
+    # trust_env and the dummy cookie jar match the session azure-core would build itself,
+    # so proxy settings are honoured and service cookies aren't carried between calls
+    session = aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(
+            limit=64,
+            limit_per_host=32,
+            keepalive_timeout=120,
+            enable_cleanup_closed=True,
+            ttl_dns_cache=600
+        ),
+        trust_env=True,
+        cookie_jar=aiohttp.DummyCookieJar()
+    )
     search_client = SearchClient(
         search_endpoint,
         search_index,
         credentials,
+        transport=AioHttpTransport(session=session, session_owner=True),
         user_agent="RTMiddleTier"
     )
 
+    semantic_cache = SemanticCache(threshold=semantic_cache_threshold, ttl=semantic_cache_ttl) if embedding_client else None
+    source_cache: OrderedDict[str, dict] = OrderedDict()
+    # Both tools read the same fields, build the select list once rather than per call
+    select_fields = [identifier_field, title_field, content_field]
+
     # 1) Search tool
     rtmt.tools["search"] = Tool(
         schema=_search_tool_schema,
-        target=lambda args: _search_tool(
+        target=lambda args, ttl=None: _search_tool(
             search_client,
+            semantic_cache,
+            embedding_client,
+            embedding_deployment,
+            source_cache,
             semantic_configuration,
             identifier_field,
+            title_field,
             content_field,
             embedding_field,
             use_vector_query,
-            args
+            select_fields,
+            args,
+            ttl=ttl
         )
     )
 
@@ -429,9 +720,11 @@ def attach_rag_tools(
         schema=_grounding_tool_schema,
         target=lambda args: _report_grounding_tool(
             search_client,
+            source_cache,
             identifier_field,
             title_field,
             content_field,
+            select_fields,
             args
         )
     )
@@ -449,4 +742,5 @@ def attach_rag_tools(
     )
 
     print(f"Attached tools: {', '.join(rtmt.tools.keys())}")
+    return search_client
 
@@ -119,23 +119,27 @@ class RTMiddleTier:
                         tool = self.tools[item["name"]]
                         args = item["arguments"]
                         result = await tool.target(json.loads(args))
-                        await server_ws.send_json({
+                        result_text = result.to_text()
+                        # The realtime API takes a function call's output as one complete item, so
+                        # results can't be streamed; instead send to both sockets concurrently
+                        sends = [server_ws.send_json({
                             "type": "conversation.item.create",
                             "item": {
                                 "type": "function_call_output",
                                 "call_id": item["call_id"],
-                                "output": result.to_text() if result.destination == ToolResultDirection.TO_SERVER else ""
+                                "output": result_text if result.destination == ToolResultDirection.TO_SERVER else ""
                             }
-                        })
+                        })]
                         if result.destination == ToolResultDirection.TO_CLIENT:
                             # TODO: this will break clients that don't know about this extra message, rewrite 
                             # this to be a regular text message with a special marker of some sort
-                            await client_ws.send_json({
+                            sends.append(client_ws.send_json({
                                 "type": "extension.middle_tier_tool_response",
                                 "previous_item_id": tool_call.previous_id,
                                 "tool_name": item["name"],
-                                "tool_result": result.to_text()
-                            })
+                                "tool_result": result_text
+                            }))
+                        await asyncio.gather(*sends)
                         updated_message = None
 
                 case "response.done":
@@ -0,0 +1,104 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Optional
+
+import faiss
+import numpy as np
+
+
+class SemanticCache:
+    """
+    In-process cache of tool results keyed by query embedding. A lookup returns the
+    result stored for the most similar cached query when its cosine similarity is at
+    least `threshold`. Entries expire after `ttl` seconds, or the `ttl` given when adding
+    them, and the least recently used entry is evicted once `max_entries` is reached.
+
+    Results are also kept by normalized query text, checked with `lookup_exact` before
+    embedding the query at all, since repeated questions dominate real traffic.
+    """
+    threshold: float
+    ttl: float
+    max_entries: int
+    max_exact_entries: int
+
+    def __init__(self, threshold: float = 0.92, ttl: float = 300, max_entries: int = 512, max_exact_entries: int = 256):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_exact_entries = max_exact_entries
+        self._exact: OrderedDict[str, tuple[str, float]] = OrderedDict()  # query key -> (result, expires_at)
+        # The index is created on first insert, once the embedding dimension is known
+        self._index: Optional[faiss.IndexIDMap] = None
+        self._entries: OrderedDict[int, tuple[str, float]] = OrderedDict()  # id -> (result, expires_at)
+        self._next_id = 0
+        self._lock = asyncio.Lock()
+
+    def _expires_at(self, ttl: Optional[float]) -> float:
+        return time.monotonic() + (self.ttl if ttl is None else ttl)
+
+    @staticmethod
+    def _normalize(embedding: list[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype="float32").reshape(1, -1)
+        faiss.normalize_L2(vector)
+        return vector
+
+    def lookup_exact(self, key: str) -> Optional[str]:
+        entry = self._exact.get(key)
+        if entry is None:
+            return None
+        result, expires_at = entry
+        if time.monotonic() > expires_at:
+            del self._exact[key]
+            return None
+        self._exact.move_to_end(key)
+        return result
+
+    def add_exact(self, key: str, result: str, ttl: Optional[float] = None, expires_at: Optional[float] = None) -> None:
+        """
+        Pass `expires_at` from `lookup` when storing a semantic hit, so the result isn't
+        served for longer than the entry it came from.
+        """
+        self._exact[key] = (result, expires_at if expires_at is not None else self._expires_at(ttl))
+        self._exact.move_to_end(key)
+        if len(self._exact) > self.max_exact_entries:
+            self._exact.popitem(last=False)
+
+    async def lookup(self, embedding: list[float]) -> Optional[tuple[str, float]]:
+        """Returns the (result, expires_at) of the closest cached query, if similar enough."""
+        vector = self._normalize(embedding)
+        async with self._lock:
+            if self._index is None or self._index.ntotal == 0:
+                return None
+            scores, ids = self._index.search(vector, 1)
+            entry_id = int(ids[0][0])
+            if entry_id < 0 or scores[0][0] < self.threshold:
+                return None
+            result, expires_at = self._entries[entry_id]
+            if time.monotonic() > expires_at:
+                del self._entries[entry_id]
+                self._index.remove_ids(np.array([entry_id], dtype="int64"))
+                return None
+            self._entries.move_to_end(entry_id)
+            return result, expires_at
+
+    async def add(self, embedding: list[float], result: str, ttl: Optional[float] = None) -> None:
+        vector = self._normalize(embedding)
+        async with self._lock:
+            if self._index is None:
+                self._index = faiss.IndexIDMap(faiss.IndexFlatIP(vector.shape[1]))
+            self._evict()
+            entry_id = self._next_id
+            self._next_id += 1
+            self._index.add_with_ids(vector, np.array([entry_id], dtype="int64"))
+            self._entries[entry_id] = (result, self._expires_at(ttl))
+
+    def _evict(self) -> None:
+        now = time.monotonic()
+        evicted = [i for i, (_, expires_at) in self._entries.items() if now > expires_at]
+        for i in evicted:
+            del self._entries[i]
+        while len(self._entries) >= self.max_entries:
+            evicted.append(self._entries.popitem(last=False)[0])
+        if evicted:
+            self._index.remove_ids(np.array(evicted, dtype="int64"))